@@ -0,0 +1,34 @@
+"""
+Gunicorn settings for running BlogSphere in production
+
+    gunicorn -c gunicorn.conf.py mainlocal:app
+
+Workers fork from a master that has already parsed the data files, then keep
+their own copies and notice writes from other workers through the files'
+mtime/size/inode signature.
+Writers are serialized across workers by lock files next to the data files.
+"""
+
+import os
+import multiprocessing
+
+# nginx proxies to this address (see nginx.conf)
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+# Threads rather than gevent: requests block on file locks and argon2, which gevent can't yield during
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+# Uploads can be up to MAX_CONTENT_LENGTH, give slow clients time to send them
+timeout = 120
+accesslog = '-'
+# Import the app once in the master; workers fork with the data files already parsed
+preload_app = True
+
+
+def on_starting(server):
+    # Create the data files and the admin account and warm the caches once, before any worker forks
+    from mainlocal import config, calibrate_password_hasher, initialize_data, warm_caches
+    if config.ARGON2_TARGET_MS:
+        calibrate_password_hasher(config.ARGON2_TARGET_MS)
+    initialize_data()
+    warm_caches()
@@ -8,16 +8,46 @@ Uses JSON files in the data folder instead of database
 import os
 import re
 import sys
+import time
 import json
 import logging
+import hashlib
+import threading
+import operator
+import functools
+from urllib.parse import quote
+from collections import Counter, namedtuple
+from contextlib import contextmanager, ExitStack
 from datetime import datetime
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_from_directory
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_from_directory, session, g, has_request_context, abort
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+from werkzeug.utils import secure_filename, safe_join
+from filelock import FileLock
+from argon2 import PasswordHasher, extract_parameters
+from argon2.exceptions import InvalidHashError, VerificationError
+from argon2.low_level import ARGON2_VERSION
+
+# orjson parses and encodes several times faster than the stdlib; fall back if it isn't installed
+try:
+    import orjson
+    json_loads = orjson.loads
+
+    def json_dumps(data, pretty=False):
+        """Encode data as UTF-8 JSON bytes"""
+        return orjson.dumps(data, default=str, option=orjson.OPT_INDENT_2 if pretty else 0)
+except ImportError:
+    orjson = None
+    json_loads = json.loads
+
+    def json_dumps(data, pretty=False):
+        """Encode data as UTF-8 JSON bytes"""
+        if pretty:
+            return json.dumps(data, indent=2, default=str, ensure_ascii=False).encode('utf-8')
+        return json.dumps(data, separators=(',', ':'), default=str, ensure_ascii=False).encode('utf-8')
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO').upper())
 logger = logging.getLogger(__name__)
 
 # Configuration
@@ -26,6 +56,24 @@ class Config:
     SECRET_KEY = "secretkey"
     UPLOAD_FOLDER = 'uploads'
     MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 60MB
+    UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+    POSTS_PER_PAGE = 25
+    UPLOAD_CACHE_MAX_AGE = 365 * 24 * 60 * 60  # 1 year
+    # Let a front-end server (Apache mod_xsendfile, lighttpd) send upload bytes
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE') == '1'
+    # nginx internal location that serves uploads via X-Accel-Redirect, e.g. '/_uploads/'
+    UPLOAD_ACCEL_PREFIX = os.environ.get('UPLOAD_ACCEL_PREFIX', '')
+    # Flush every data file write to disk before it replaces the old file; FSYNC_DATA=0 trades
+    # crash durability of the latest writes for faster writes (the swap itself stays atomic)
+    FSYNC_DATA = os.environ.get('FSYNC_DATA', '1') != '0'
+    # 'argon2' or 'pbkdf2'; stored hashes of the other scheme are upgraded on login
+    PASSWORD_HASH_SCHEME = os.environ.get('PASSWORD_HASH_SCHEME', 'argon2')
+    ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', 2))
+    ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', 19456))  # KiB
+    ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', 1))
+    # When set, raise the argon2 time cost at startup until one hash takes about this long
+    ARGON2_TARGET_MS = int(os.environ.get('ARGON2_TARGET_MS', 0))
+    PBKDF2_METHOD = os.environ.get('PBKDF2_METHOD', 'pbkdf2:sha256:600000')
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -33,34 +81,256 @@ config = Config()
 app.secret_key = config.SECRET_KEY
 app.config['UPLOAD_FOLDER'] = config.UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = config.MAX_CONTENT_LENGTH
+app.config['USE_X_SENDFILE'] = config.USE_X_SENDFILE
 
 # Create data and uploads directories
 os.makedirs(config.DATA_FOLDER, exist_ok=True)
 os.makedirs(config.UPLOAD_FOLDER, exist_ok=True)
 
 # File storage helper functions
-def load_json_file(filename):
-    """Load data from JSON file"""
-    file_path = os.path.join(config.DATA_FOLDER, filename)
-    if os.path.exists(file_path):
+
+# Every data file, and the ones the enriched feed is built from. Comments and likes
+# are JSON Lines, one record per line, so new ones are appended instead of rewriting the file
+DATA_FILES = ('Users.json', 'Posts.json', 'Comments.jsonl', 'likes.jsonl')
+FEED_FILES = ('Posts.json', 'Users.json')
+
+@functools.lru_cache(maxsize=None)
+def data_path(filename):
+    """Path of a data file; the data folder is fixed at startup"""
+    return os.path.join(config.DATA_FOLDER, filename)
+
+def stat_signature(st):
+    """Signature of a data file from its os.stat() result"""
+    # The inode changes when another worker swaps in a new copy of the file
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+def file_signature(filename):
+    """Return a value that changes whenever a data file is rewritten"""
+    try:
+        return stat_signature(os.stat(data_path(filename)))
+    except OSError:
+        return None
+
+# Parsed data files keyed by filename, as (signature, records)
+_JSON_CACHE = {}
+# One lock per file, so a thread parsing Posts.json doesn't hold up readers of Users.json
+_JSON_CACHE_LOCKS = {}
+
+def is_json_lines(filename):
+    """Whether a data file holds one JSON record per line rather than a JSON list"""
+    return filename.endswith('.jsonl')
+
+def parse_json_lines(raw, filename):
+    """Parse a JSON Lines file, skipping a last line torn by a crash mid-append"""
+    lines = raw.split(b'\n')
+    # Empty when the file ends with a newline, as every complete append does
+    tail = lines.pop()
+    records = [json_loads(line) for line in lines if line.strip()]
+    if tail.strip():
+        try:
+            records.append(json_loads(tail))
+        except ValueError:
+            logger.warning(f"Skipping incomplete last line of {filename}")
+    return records
+
+def encode_json_lines(records):
+    """Encode records as JSON Lines bytes"""
+    return b''.join(json_dumps(record) + b'\n' for record in records)
+
+def read_json_entry(filename, strict=False):
+    """Return (signature, records) for a data file, reusing the parsed list until the file changes
+
+    The signature is that of the copy the records were parsed from, which
+    may be newer than one taken before the call.
+    """
+    signature = file_signature(filename)
+    if signature is None:
+        return (None, [])
+    cached = _JSON_CACHE.get(filename)
+    if cached and cached[0] == signature:
+        return cached
+    lock = _JSON_CACHE_LOCKS.get(filename) or _JSON_CACHE_LOCKS.setdefault(filename, threading.Lock())
+    with lock:
+        # Another thread may have parsed the file while we waited
+        cached = _JSON_CACHE.get(filename)
+        if cached and cached[0] == signature:
+            return cached
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with open(data_path(filename), 'rb') as f:
+                # Stat the open file, in case a writer swapped in a new copy since we looked
+                signature = stat_signature(os.fstat(f.fileno()))
+                raw = f.read()
+            data = parse_json_lines(raw, filename) if is_json_lines(filename) else json_loads(raw)
         except (json.JSONDecodeError, Exception) as e:
             logger.error(f"Error loading {filename}: {e}")
-            return []
-    return []
+            if strict:
+                raise
+            return (None, [])
+        _JSON_CACHE[filename] = (signature, data)
+        return (signature, data)
+
+def read_json_file(filename, strict=False):
+    """Load data from JSON file, reusing the parsed list until the file changes
+
+    The returned list is shared between requests and must not be modified;
+    use json_store() to change a file. An unreadable file loads as an empty
+    list unless strict is set, in which case the error is raised.
+    """
+    return read_json_entry(filename, strict)[1]
 
 def save_json_file(filename, data):
     """Save data to JSON file"""
-    file_path = os.path.join(config.DATA_FOLDER, filename)
+    file_path = data_path(filename)
+    # Write a temporary file and swap it in, so readers and the mtime cache
+    # only ever see a complete file
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
     try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, default=str)
-        return True
+        with open(tmp_path, 'wb') as f:
+            f.write(encode_json_lines(data) if is_json_lines(filename) else json_dumps(data))
+            if config.FSYNC_DATA:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
     except Exception as e:
         logger.error(f"Error saving {filename}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
         return False
+    # What we just wrote is what the next load would parse
+    _JSON_CACHE[filename] = (file_signature(filename), data)
+    return True
+
+def append_json_lines(filename, data, records):
+    """Append records to a JSON Lines file; data is the file's full list after the append
+
+    Callers must hold the file's lock. A crash mid-append leaves at most an
+    incomplete last line, which loading skips and the next append cuts off.
+    """
+    file_path = data_path(filename)
+    try:
+        fd = os.open(file_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            payload = encode_json_lines(records)
+            size = os.fstat(fd).st_size
+            if size and os.pread(fd, 1, size - 1) != b'\n':
+                # The last line has no newline: finish it if it parses, otherwise it's a torn append
+                start = os.pread(fd, size, 0).rfind(b'\n') + 1
+                try:
+                    json_loads(os.pread(fd, size - start, start))
+                    payload = b'\n' + payload
+                except ValueError:
+                    os.ftruncate(fd, start)
+            view = memoryview(payload)
+            while view:
+                view = view[os.write(fd, view):]
+            if config.FSYNC_DATA:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+    except Exception as e:
+        logger.error(f"Error appending to {filename}: {e}")
+        return False
+    _JSON_CACHE[filename] = (file_signature(filename), data)
+    return True
+
+# Lookups derived from a data file, rebuilt only when the file changes on disk
+_INDEX_CACHE = {}
+# Updates to cached lookups queued inside an open json_store block, keyed by filename
+_PENDING_INDEXES = {}
+
+def get_index(filename, name, build):
+    """Return build(records) for a data file, cached until the file changes"""
+    key = (filename, name)
+    signature = file_signature(filename)
+    cached = _INDEX_CACHE.get(key)
+    if cached and signature is not None and cached[0] == signature:
+        return cached[1]
+    # Stamp the index with the version it was built from, not the one we checked
+    signature, records = read_json_entry(filename)
+    index = build(records)
+    _INDEX_CACHE[key] = (signature, index)
+    return index
+
+def cached_on_files(*filenames):
+    """Cache a function's result per arguments until any of the given data files change"""
+    def decorator(func):
+        cache = {}
+        @functools.wraps(func)
+        def wrapper(*args):
+            signature = tuple(file_signature(f) for f in filenames)
+            cached = cache.get(args)
+            if cached and None not in signature and cached[0] == signature:
+                return cached[1]
+            value = func(*args)
+            cache[args] = (signature, value)
+            return value
+        return wrapper
+    return decorator
+
+def patch_index(filename, name, update):
+    """Update a cached lookup from inside json_store instead of rebuilding it
+
+    The update is applied once the block's changes are saved, so other
+    threads never see records that aren't on disk yet.
+    """
+    _PENDING_INDEXES.setdefault(filename, []).append(((filename, name), update))
+
+def adjust_post_count(filename, post_id, delta):
+    """Patch a cached per-post count instead of recounting the file"""
+    patch_index(filename, 'count_by_post', lambda counts: counts.update({post_id: delta}))
+
+# Serializes read-modify-write cycles so concurrent requests don't lose updates
+_STORE_LOCK = threading.RLock()
+# Lock files that keep writers in other worker processes out while a file is updated
+_FILE_LOCKS = {}
+
+def file_lock(filename):
+    """Return the cross-process lock for a data file"""
+    lock = _FILE_LOCKS.get(filename)
+    if lock is None:
+        lock = _FILE_LOCKS.setdefault(filename, FileLock(data_path(filename) + '.lock'))
+    return lock
+
+@contextmanager
+def json_store(filename):
+    """Load a JSON file for modification and save it back when the block succeeds
+
+    Raises OSError if the file can't be saved.
+    """
+    with _STORE_LOCK, file_lock(filename):
+        # Never save over a file we couldn't parse; that would replace its records with this block's
+        before, original = read_json_entry(filename, strict=True)
+        # Work on a copy so the cached list stays intact if the block fails
+        data = list(original)
+        saved = False
+        try:
+            yield data
+            added = len(data) - len(original)
+            if is_json_lines(filename) and added > 0 and all(a is b for a, b in zip(data, original)):
+                # The block only added records: append them rather than rewriting every line
+                saved = append_json_lines(filename, data, data[-added:])
+            else:
+                saved = save_json_file(filename, data)
+            if not saved:
+                # Fail loudly so callers, and any stores opened alongside this one, don't carry on
+                raise OSError(f"Could not save {filename}")
+        finally:
+            # Patch lookups built from the version we just replaced and stamp them with the new one;
+            # if nothing was written they still match the file and are left alone
+            pending = _PENDING_INDEXES.pop(filename, ())
+            if saved:
+                signature = file_signature(filename)
+                patched = {}
+                for key, update in pending:
+                    index = patched.get(key)
+                    if index is None:
+                        cached = _INDEX_CACHE.get(key)
+                        if not cached or cached[0] != before:
+                            continue
+                        index = patched[key] = cached[1]
+                    update(index)
+                for key, index in patched.items():
+                    _INDEX_CACHE[key] = (signature, index)
 
 def get_next_id(data_list):
     """Get the next available ID"""
@@ -83,67 +353,70 @@ login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login' #type: ignore
 
+@cached_on_files('Users.json')
+def build_login_user(user_id):
+    """The logged-in User for an id, shared across requests until Users.json changes"""
+    user_data = get_users_by_id().get(user_id)
+    
+    if user_data:
+        return User(
+            user_data['id'], 
+            user_data['username'], 
+            user_data['email'], 
+            user_data['password_hash'], 
+            user_data.get('is_admin', False),
+            user_data.get('created_at')
+        )
+    return None
+
 @login_manager.user_loader
 def load_user(user_id):
+    # Flask-Login already keeps the loaded user for the rest of the request
     try:
-        users = load_json_file('Users.json')
-        user_data = next((u for u in users if u['id'] == int(user_id)), None)
-        
-        if user_data:
-            return User(
-                user_data['id'], 
-                user_data['username'], 
-                user_data['email'], 
-                user_data['password_hash'], 
-                user_data.get('is_admin', False),
-                user_data.get('created_at')
-            )
-        return None
+        return build_login_user(int(user_id))
     except Exception as e:
         logger.error(f"Error loading user: {e}")
         return None
 
+# URLs with optional custom text, compiled once instead of on every render
+AUTOLINK_PATTERN = re.compile(r'((?:https?://|http://|www\.)[^\s<]+)(?:\s+__([^_]+)__)?')
+
+def _autolink_replace(match):
+    url = match.group(1)
+    display_text = match.group(2) if match.group(2) else url
+    href = url if url.startswith('http') else f'https://{url}'  # Add https for www.
+    return f'<a href="{href}" target="_blank" rel="noopener noreferrer">{display_text}</a>'
+
 @app.template_filter('autolink')
 def autolink(text):
     # Step 1: Replace newline characters with <br>
     text = text.replace('\r\n', '<br>').replace('\n', '<br>').replace('\r', '<br>')
 
     # Step 2: Replace URLs with clickable links (with optional custom text)
-    pattern = r'((?:https?://|http://|www\.)[^\s<]+)(?:\s+__([^_]+)__)?'
-
-    def replace(match):
-        url = match.group(1)
-        display_text = match.group(2) if match.group(2) else url
-        href = url if url.startswith('http') else f'https://{url}'  # Add https for www.
-        return f'<a href="{href}" target="_blank" rel="noopener noreferrer">{display_text}</a>'
+    return AUTOLINK_PATTERN.sub(_autolink_replace, text)
 
-    return re.sub(pattern, replace, text)
+DATETIME_DISPLAY_FORMAT = '%B %d, %Y at %I:%M %p'
 
-# Template filter for JSON
-@app.template_filter('from_json')
-def from_json_filter(value):
-    if value:
-        try:
-            if isinstance(value, str):
-                return json.loads(value)
-            return value
-        except:
-            return []
-    return []
+@functools.lru_cache(maxsize=8192)
+def format_iso_datetime(value):
+    """Format an ISO timestamp string; stored timestamps never change, so results are cached"""
+    # Only a trailing UTC designator needs rewriting for fromisoformat
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    dt = datetime.fromisoformat(value)
+    return dt.strftime(DATETIME_DISPLAY_FORMAT)
 
 # Template filter for datetime formatting
 @app.template_filter('format_datetime')
 def format_datetime(value):
     if value:
         try:
-            from datetime import datetime
             if isinstance(value, str):
                 # Try to parse datetime string
-                dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
-                return dt.strftime('%B %d, %Y at %I:%M %p') 
+                return format_iso_datetime(value)
             elif hasattr(value, 'strftime'):
                 # It's already a datetime object
-                return value.strftime('%B %d, %Y at %I:%M %p')
+                return value.strftime(DATETIME_DISPLAY_FORMAT)
             else:
                 return str(value)
         except (ValueError, AttributeError):
@@ -151,56 +424,339 @@ def format_datetime(value):
     return 'No date'
 
 # Helper functions
+ALLOWED_EXTENSIONS = frozenset({'png', 'jpg', 'jpeg', 'gif', 'mp4', 'avi', 'mov', 'wmv', 'pdf', 'doc', 'docx', 'txt', 'ppt', 'pptx', 'xls', 'xlsx', 'sql', 'zip'})
+
+PASSWORD_HASH_SCHEMES = ('argon2', 'pbkdf2')
+
+def normalize_pbkdf2_method(method):
+    """Spell out a Werkzeug PBKDF2 method the way it is stored in the hash, e.g. 'pbkdf2' -> 'pbkdf2:sha256:600000'"""
+    name, *args = method.split(':')
+    if name != 'pbkdf2' or len(args) > 2:
+        raise ValueError(f"Unsupported PBKDF2_METHOD {method!r}; expected 'pbkdf2[:<hash>[:<iterations>]]'")
+    hash_name = args[0] if args else 'sha256'
+    iterations = int(args[1]) if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS
+    return f'pbkdf2:{hash_name}:{iterations}'
+
+# Refuse to start with a scheme we'd silently replace with argon2
+if config.PASSWORD_HASH_SCHEME not in PASSWORD_HASH_SCHEMES:
+    raise ValueError(f"Unknown PASSWORD_HASH_SCHEME {config.PASSWORD_HASH_SCHEME!r}; expected one of {PASSWORD_HASH_SCHEMES}")
+# Compared against the method prefix of stored hashes, so it must match how Werkzeug writes them
+config.PBKDF2_METHOD = normalize_pbkdf2_method(config.PBKDF2_METHOD)
+
+# Argon2 runs in C and releases the GIL, unlike verifying 600k PBKDF2 rounds
+password_hasher = PasswordHasher(time_cost=config.ARGON2_TIME_COST,
+                                 memory_cost=config.ARGON2_MEMORY_COST,
+                                 parallelism=config.ARGON2_PARALLELISM)
+
+def calibrate_password_hasher(target_ms, max_time_cost=16):
+    """Raise the argon2 time cost until hashing takes at least target_ms on this machine
+
+    Run once before workers start so every worker hashes with the same
+    parameters. The result varies a little between runs; hashes made with a
+    higher time cost by an earlier run are kept rather than rehashed.
+    """
+    global password_hasher
+    time_cost = config.ARGON2_TIME_COST
+    while True:
+        hasher = PasswordHasher(time_cost=time_cost,
+                                memory_cost=config.ARGON2_MEMORY_COST,
+                                parallelism=config.ARGON2_PARALLELISM)
+        started = time.perf_counter()
+        hasher.hash('calibration')
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms >= target_ms or time_cost >= max_time_cost:
+            break
+        time_cost += 1
+    password_hasher = hasher
+    logger.info(f'Argon2 calibrated: time_cost={time_cost} ({elapsed_ms:.0f} ms per hash)')
+
+def hash_password(password):
+    """Hash a password for storage with the configured scheme"""
+    if config.PASSWORD_HASH_SCHEME == 'pbkdf2':
+        return generate_password_hash(password, method=config.PBKDF2_METHOD)
+    return password_hasher.hash(password)
+
+def verify_password(password_hash, password):
+    """Check a password against a stored argon2 hash or a legacy Werkzeug PBKDF2 hash"""
+    if password_hash.startswith('$argon2'):
+        try:
+            return password_hasher.verify(password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    return check_password_hash(password_hash, password)
+
+def password_needs_rehash(password_hash):
+    """Hashes from the other scheme or with outdated parameters are upgraded on login"""
+    if config.PASSWORD_HASH_SCHEME == 'pbkdf2':
+        return password_hash.split('$', 1)[0] != config.PBKDF2_METHOD
+    if not password_hash.startswith('$argon2'):
+        return True
+    try:
+        stored = extract_parameters(password_hash)
+    except InvalidHashError:
+        return True
+    # Only upgrade weaker hashes, so a lower time cost from a noisy calibration doesn't rehash everyone
+    return (stored.type != password_hasher.type
+            or stored.version != ARGON2_VERSION
+            or stored.time_cost < password_hasher.time_cost
+            or stored.memory_cost < password_hasher.memory_cost
+            or stored.parallelism < password_hasher.parallelism
+            or stored.hash_len < password_hasher.hash_len
+            or stored.salt_len < password_hasher.salt_len)
+
 def allowed_file(filename):
-    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'mp4', 'avi', 'mov', 'wmv', 'pdf', 'doc', 'docx', 'txt', 'ppt', 'pptx', 'xls', 'xlsx', 'sql', 'zip'}
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    dot = filename.rfind('.')
+    return dot != -1 and filename[dot + 1:].lower() in ALLOWED_EXTENSIONS
 
-def get_posts():
+CONTENT_HASH_NAME = re.compile(r'^[0-9a-f]{32}(\.\w+)?$')
+
+def save_upload(file):
+    """Stream an uploaded file into the upload folder and return its stored name
+
+    Files are named after a hash of their contents, so names never collide
+    and a stored file never changes under its name.
+    """
+    ext = os.path.splitext(secure_filename(file.filename))[1].lower()
+    folder = app.config['UPLOAD_FOLDER']
+    digest = hashlib.blake2b(digest_size=16)
+    tmp_path = os.path.join(folder, f".upload-{os.getpid()}-{threading.get_ident()}.tmp")
+    # Reuse one chunk buffer and write it unbuffered: one read and one write syscall per chunk
+    buffer = memoryview(bytearray(config.UPLOAD_CHUNK_SIZE))
     try:
-        posts = load_json_file('Posts.json')
-        users = load_json_file('Users.json')
-        likes = load_json_file('likes.json')
-        comments = load_json_file('Comments.json')
-        
-        # Create user lookup
-        user_lookup = {u['id']: u for u in users}
-        
-        # Add additional data to posts
-        enriched_posts = []
-        for post in posts:
-            # Get author info
-            author = user_lookup.get(post['user_id'], {})
-            
-            # Count likes and comments
-            like_count = len([l for l in likes if l['post_id'] == post['id']])
-            comment_count = len([c for c in comments if c['post_id'] == post['id']])
-            
-            enriched_post = {
-                'id': post['id'],
-                'user_id': post['user_id'],
-                'title': post['title'],
-                'content': post['content'],
-                'images': post.get('images'),
-                'videos': post.get('videos'),
-                'created_at': post['created_at'],
-                'author': {'username': author.get('username', 'Unknown')},
-                'like_count': like_count,
-                'comment_count': comment_count
-            }
-            enriched_posts.append(enriched_post)
+        with open(tmp_path, 'wb', buffering=0) as dst:
+            while True:
+                size = file.stream.readinto(buffer)
+                if not size:
+                    break
+                chunk = buffer[:size]
+                digest.update(chunk)
+                while chunk:
+                    chunk = chunk[dst.write(chunk):]
+        filename = digest.hexdigest() + ext
+        # An existing file with this name already holds the same bytes
+        os.replace(tmp_path, os.path.join(folder, filename))
+    except Exception:
+        # Don't leave a partial upload behind when the client disconnects or the disk fills up
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return filename
+
+def media_list(value):
+    """Return a post's stored media filenames as a list"""
+    if isinstance(value, str):
+        # Older records kept the list as JSON text; migrate_media_fields() converts them at startup
+        try:
+            return json_loads(value)
+        except ValueError:
+            return []
+    return value or []
+
+def count_by_post(records):
+    """Count likes or comments per post_id"""
+    return Counter(r['post_id'] for r in records)
+
+def index_by(field):
+    """Return a builder mapping each record's field to the record, first one wins"""
+    def build(records):
+        index = {}
+        for r in records:
+            index.setdefault(r[field], r)
+        return index
+    return build
+
+def group_by(field):
+    """Return a builder grouping records by a field, keeping file order within each group"""
+    def build(records):
+        groups = {}
+        for r in records:
+            groups.setdefault(r[field], []).append(r)
+        return groups
+    return build
+
+def index_like_pairs(likes):
+    """Map each (user_id, post_id) pair to its like"""
+    return {(l['user_id'], l['post_id']): l for l in likes}
+
+# Builders are created once here rather than on every lookup
+build_by_id = index_by('id')
+build_by_username = index_by('username')
+build_by_email = index_by('email')
+build_by_post = group_by('post_id')
+created_at_key = operator.itemgetter('created_at')
+
+def get_like_counts():
+    return get_index('likes.jsonl', 'count_by_post', count_by_post)
+
+def get_comment_counts():
+    return get_index('Comments.jsonl', 'count_by_post', count_by_post)
+
+def get_like_pairs():
+    return get_index('likes.jsonl', 'by_pair', index_like_pairs)
+
+def get_post_counts():
+    """Like and comment counters, looked up once per request rather than once per post shown"""
+    if not has_request_context():
+        return get_like_counts(), get_comment_counts()
+    counts = g.get('post_counts')
+    if counts is None:
+        counts = g.post_counts = (get_like_counts(), get_comment_counts())
+    return counts
+
+def group_comments_by_post(comments):
+    """Group comments by post, oldest first as the post page lists them"""
+    groups = build_by_post(comments)
+    for group in groups.values():
+        group.sort(key=created_at_key)
+    return groups
+
+def get_comments_by_post():
+    # New comments are appended to their group and are always the newest, so groups stay sorted
+    return get_index('Comments.jsonl', 'by_post', group_comments_by_post)
+
+def get_posts_by_id():
+    return get_index('Posts.json', 'by_id', build_by_id)
+
+def get_users_by_id():
+    return get_index('Users.json', 'by_id', build_by_id)
+
+def get_users_by_username():
+    return get_index('Users.json', 'by_username', build_by_username)
+
+def get_users_by_email():
+    return get_index('Users.json', 'by_email', build_by_email)
+
+# Immutable rows for cached comment and like listings
+CommentRow = namedtuple('CommentRow', 'id user_id content created_at created_at_fmt author')
+AdminCommentRow = namedtuple('AdminCommentRow', 'id user post content created_at')
+AdminLikeRow = namedtuple('AdminLikeRow', 'id user post created_at')
+
+# Shared stand-ins for deleted users and posts
+UNKNOWN_USER = {'username': 'Unknown'}
+UNKNOWN_POST = {'title': 'Unknown'}
+
+def admin_comment_rows(comments, user_lookup, post_lookup):
+    """Comments with their user and post attached, for the admin tables"""
+    return tuple(AdminCommentRow(c['id'],
+                                 user_lookup.get(c['user_id'], UNKNOWN_USER),
+                                 post_lookup.get(c['post_id'], UNKNOWN_POST),
+                                 c['content'],
+                                 c['created_at'])
+                 for c in comments)
+
+def admin_like_rows(likes, user_lookup, post_lookup):
+    """Likes with their user and post attached, for the admin tables"""
+    return tuple(AdminLikeRow(l['id'],
+                              user_lookup.get(l['user_id'], UNKNOWN_USER),
+                              post_lookup.get(l['post_id'], UNKNOWN_POST),
+                              l['created_at'])
+                 for l in likes)
+
+class FeedPost:
+    """A post as listed in the feed, with its author attached
+
+    Like and comment counts are read from the live per-post counters, so new
+    likes and comments don't require rebuilding the feed.
+    """
+    __slots__ = ('id', 'user_id', 'title', 'content', 'images', 'videos',
+                 'created_at', 'created_at_fmt', 'author')
+
+    def __init__(self, post, author):
+        self.id = post['id']
+        self.user_id = post['user_id']
+        self.title = post['title']
+        self.content = post['content']
+        self.images = media_list(post.get('images'))
+        self.videos = media_list(post.get('videos'))
+        self.created_at = post['created_at']
+        self.created_at_fmt = format_datetime(post['created_at'])
+        self.author = author
+
+    @property
+    def like_count(self):
+        return get_post_counts()[0][self.id]
+
+    @property
+    def comment_count(self):
+        return get_post_counts()[1][self.id]
+
+@cached_on_files(*FEED_FILES)
+def build_posts():
+    """Build the enriched feed, reused until a post or user changes"""
+    posts = read_json_file('Posts.json')
+    
+    # User lookup
+    user_lookup = get_users_by_id()
+    
+    # One author entry per user, shared by all of their posts
+    authors = {}
+    
+    # Add additional data to posts, newest first; posts are appended as they are created
+    enriched_posts = []
+    for post in reversed(posts):
+        author = authors.get(post['user_id'])
+        if author is None:
+            username = user_lookup.get(post['user_id'], {}).get('username', 'Unknown')
+            author = authors[post['user_id']] = {'username': username}
         
-        # Sort by created_at (newest first)
-        enriched_posts.sort(key=lambda x: x['created_at'], reverse=True)
-        return enriched_posts
+        enriched_posts.append(FeedPost(post, author))
+    
+    # Every request shares this result, so hand it out as a tuple nobody can modify
+    return tuple(enriched_posts)
+
+@cached_on_files(*FEED_FILES)
+def build_posts_by_user():
+    """Group the enriched feed by author, keeping newest-first order"""
+    by_user = {}
+    for post in build_posts():
+        by_user.setdefault(post.user_id, []).append(post)
+    return {user_id: tuple(posts) for user_id, posts in by_user.items()}
+
+def get_posts():
+    try:
+        return build_posts()
     except Exception as e:
         logger.error(f"Error getting posts: {e}")
-        return []
+        return ()
 
 # Routes
+def render_index(page):
+    posts = get_posts()
+    
+    # The feed is cached, so a page is just a slice of it
+    start = (page - 1) * config.POSTS_PER_PAGE
+    end = start + config.POSTS_PER_PAGE
+    return render_template('index.html', posts=posts[start:end], page=page, has_next=len(posts) > end)
+
+@cached_on_files(*DATA_FILES)
+def render_anonymous_index(page):
+    """Home page HTML for logged-out visitors, reused until the feed changes"""
+    return render_index(page)
+
 @app.route('/')
 def index():
-    posts = get_posts()
-    return render_template('index.html', posts=posts)
+    # Zero, negative or unparsable pages show the first page
+    page = max(request.args.get('page', 1, type=int), 1)
+    
+    # Pages past the end don't exist; an empty feed still has its first page
+    last_page = max((len(get_posts()) - 1) // config.POSTS_PER_PAGE + 1, 1)
+    if page > last_page:
+        abort(404)
+    
+    # Logged-out pages with no flashed messages are the same for everyone
+    if not current_user.is_authenticated and '_flashes' not in session:
+        return render_anonymous_index(page)
+    return render_index(page)
+
+class DuplicateUserError(ValueError):
+    """The username or email of a new account is already taken"""
+
+def check_new_user(username, email):
+    """Raise DuplicateUserError if a new account would reuse a username or email"""
+    if username in get_users_by_username():
+        raise DuplicateUserError('Username already exists')
+    if email in get_users_by_email():
+        raise DuplicateUserError('Email already exists')
 
 @app.route('/register', methods=['GET', 'POST'])
 def register():
@@ -210,22 +766,12 @@ def register():
         password = request.form['password']
         
         try:
-            users = load_json_file('Users.json')
-            
-            # Check if username exists
-            if any(u['username'] == username for u in users):
-                flash('Username already exists', 'error')
-                return redirect(url_for('register'))
-            
-            # Check if email exists
-            if any(u['email'] == email for u in users):
-                flash('Email already exists', 'error')
-                return redirect(url_for('register'))
+            # Reject known usernames and emails before paying for the password hash
+            check_new_user(username, email)
             
             # Create user
-            password_hash = generate_password_hash(password)
+            password_hash = hash_password(password)
             new_user = {
-                'id': get_next_id(users),
                 'username': username,
                 'email': email,
                 'password_hash': password_hash,
@@ -233,12 +779,21 @@ def register():
                 'created_at': datetime.utcnow().isoformat()
             }
             
-            users.append(new_user)
-            save_json_file('Users.json', users)
+            with json_store('Users.json') as users:
+                # Check again under the lock, where no other registration can slip in
+                check_new_user(username, email)
+                new_user['id'] = get_next_id(users)
+                users.append(new_user)
+                # Add the user to the lookups instead of rebuilding them
+                for field in ('id', 'username', 'email'):
+                    patch_index('Users.json', 'by_' + field, lambda index, field=field: index.setdefault(new_user[field], new_user))
             
             flash('Registration successful! Please login.', 'success')
             return redirect(url_for('login'))
             
+        except DuplicateUserError as e:
+            flash(str(e), 'error')
+            return redirect(url_for('register'))
         except Exception as e:
             logger.error(f"Registration error: {e}")
             flash('Registration failed. Please try again.', 'error')
@@ -252,10 +807,17 @@ def login():
         password = request.form['password']
         
         try:
-            users = load_json_file('Users.json')
-            user_data = next((u for u in users if u['username'] == username), None)
+            user_data = get_users_by_username().get(username)
             
-            if user_data and check_password_hash(user_data['password_hash'], password):
+            if user_data and verify_password(user_data['password_hash'], password):
+                # Upgrade the stored hash while the plain password is at hand
+                if password_needs_rehash(user_data['password_hash']):
+                    new_hash = hash_password(password)
+                    with json_store('Users.json') as users:
+                        for i, u in enumerate(users):
+                            if u['id'] == user_data['id']:
+                                # Replace rather than edit the record, which the cached list shares
+                                user_data = users[i] = {**u, 'password_hash': new_hash}
                 user = User(
                     user_data['id'], 
                     user_data['username'], 
@@ -297,29 +859,21 @@ def create_post():
         if 'images' in request.files:
             for file in request.files.getlist('images'):
                 if file and file.filename and allowed_file(file.filename):
-                    filename = secure_filename(file.filename)
-                    file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-                    images.append(filename)
+                    images.append(save_upload(file))
         
         if 'videos' in request.files:
             for file in request.files.getlist('videos'):
                 if file and file.filename and allowed_file(file.filename):
-                    filename = secure_filename(file.filename)
-                    file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-                    videos.append(filename)
+                    videos.append(save_upload(file))
         
         # Handle document uploads
         if 'documents' in request.files:
             for file in request.files.getlist('documents'):
                 if file and file.filename and allowed_file(file.filename):
-                    filename = secure_filename(file.filename)
-                    file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-                    documents.append(filename)
+                    documents.append(save_upload(file))
         
         try:
-            posts = load_json_file('Posts.json')
             new_post = {
-                'id': get_next_id(posts),
                 'user_id': current_user.id,
                 'title': title,
                 'content': content,
@@ -329,8 +883,10 @@ def create_post():
                 'created_at': datetime.utcnow().isoformat()
             }
             
-            posts.append(new_post)
-            save_json_file('Posts.json', posts)
+            # Posts.json stays in creation order, which the feed relies on instead of sorting
+            with json_store('Posts.json') as posts:
+                new_post['id'] = get_next_id(posts)
+                posts.append(new_post)
             
             flash('Post created successfully!', 'success')
             return redirect(url_for('index'))
@@ -341,66 +897,70 @@ def create_post():
     
     return render_template('create_post.html')
 
+@cached_on_files('Posts.json', 'Users.json', 'Comments.jsonl')
+def build_post_detail(post_id):
+    """A post and its comments ready to render, reused until posts, users or comments change
+
+    Dates are formatted and the content is linkified here once, not on every view.
+    """
+    user_lookup = get_users_by_id()
+    post_data = get_posts_by_id()[post_id]
+    
+    # Get author info
+    author = user_lookup.get(post_data['user_id'], {})
+    
+    post = {
+        'id': post_data['id'],
+        'user_id': post_data['user_id'],
+        'title': post_data['title'],
+        'content': post_data['content'],
+        'content_html': autolink(post_data['content']),
+        'images': media_list(post_data.get('images')),
+        'videos': media_list(post_data.get('videos')),
+        'documents': media_list(post_data.get('documents')),
+        'created_at': post_data['created_at'],
+        'created_at_fmt': format_datetime(post_data['created_at']),
+        'author': {
+            'username': author.get('username', 'Unknown'),
+            'created_at': author.get('created_at'),
+            'created_at_fmt': format_datetime(author.get('created_at'))
+        }
+    }
+    
+    # Get comments with author info, already in created_at order
+    post_comments = []
+    authors = {}
+    for comment in get_comments_by_post().get(post_id, []):
+        comment_author = authors.get(comment['user_id'])
+        if comment_author is None:
+            username = user_lookup.get(comment['user_id'], {}).get('username', 'Unknown')
+            comment_author = authors[comment['user_id']] = {'username': username}
+        post_comments.append(CommentRow(comment['id'], comment['user_id'], comment['content'],
+                                        comment['created_at'], format_datetime(comment['created_at']),
+                                        comment_author))
+    
+    return post, tuple(post_comments)
+
 @app.route('/post/<int:post_id>')
 def post_detail(post_id):
     try:
-        posts = load_json_file('Posts.json')
-        users = load_json_file('Users.json')
-        likes = load_json_file('likes.json')
-        comments = load_json_file('Comments.json')
-        
-        # Find the post
-        post_data = next((p for p in posts if p['id'] == post_id), None)
-        if not post_data:
+        # Only look up posts that exist, so the per-post cache can't grow with made-up ids
+        if post_id not in get_posts_by_id():
             flash('Post not found', 'error')
             return redirect(url_for('index'))
         
-        # Get author info
-        author = next((u for u in users if u['id'] == post_data['user_id']), {})
-        
-        # Count likes and comments
-        like_count = len([l for l in likes if l['post_id'] == post_id])
-        comment_count = len([c for c in comments if c['post_id'] == post_id])
-        
-        post = {
-            'id': post_data['id'],
-            'user_id': post_data['user_id'],
-            'title': post_data['title'],
-            'content': post_data['content'],
-            'images': post_data.get('images'),
-            'videos': post_data.get('videos'),
-            'documents': post_data.get('documents'),
-            'created_at': post_data['created_at'],
-            'author': {
-                'username': author.get('username', 'Unknown'),
-                'created_at': author.get('created_at')
-            },
-            'like_count': like_count,
-            'comment_count': comment_count
-        }
+        cached_post, post_comments = build_post_detail(post_id)
         
-        # Get comments with author info
-        post_comments = []
-        for comment in comments:
-            if comment['post_id'] == post_id:
-                comment_author = next((u for u in users if u['id'] == comment['user_id']), {})
-                post_comments.append({
-                    'id': comment['id'],
-                    'user_id': comment['user_id'],
-                    'content': comment['content'],
-                    'created_at': comment['created_at'],
-                    'author': {'username': comment_author.get('username', 'Unknown')}
-                })
+        # Counts come from the live counters; add them to a copy of the shared cached post
+        like_counts, comment_counts = get_post_counts()
+        post = dict(cached_post, like_count=like_counts[post_id], comment_count=comment_counts[post_id])
         
-        # Sort comments by created_at
-        post_comments.sort(key=lambda x: x['created_at'])
+        user_liked = current_user.is_authenticated and (current_user.id, post_id) in get_like_pairs()
         
-        return render_template('post_detail.html', post=post, comments=post_comments)
+        return render_template('post_detail.html', post=post, comments=post_comments, user_liked=user_liked)
         
     except Exception as e:
-        logger.error(f"Post detail error: {e}")
-        import traceback
-        logger.error(f"Full traceback: {traceback.format_exc()}")
+        logger.exception("Post detail error for post %s", post_id)
         flash(f'Error loading post: {str(e)}', 'error')
         return redirect(url_for('index'))
 
@@ -408,25 +968,27 @@ def post_detail(post_id):
 @login_required
 def like_post(post_id):
     try:
-        likes = load_json_file('likes.json')
-        
-        # Check if already liked
-        existing_like = next((l for l in likes if l['user_id'] == current_user.id and l['post_id'] == post_id), None)
-        
-        if existing_like:
-            # Remove like
-            likes = [l for l in likes if not (l['user_id'] == current_user.id and l['post_id'] == post_id)]
-        else:
-            # Add like
-            new_like = {
-                'id': get_next_id(likes),
-                'user_id': current_user.id,
-                'post_id': post_id,
-                'created_at': datetime.utcnow().isoformat()
-            }
-            likes.append(new_like)
-        
-        save_json_file('likes.json', likes)
+        with json_store('likes.jsonl') as likes:
+            # Check if already liked
+            key = (current_user.id, post_id)
+            existing_like = get_like_pairs().get(key)
+            
+            if existing_like:
+                # Remove like
+                likes.remove(existing_like)
+                patch_index('likes.jsonl', 'by_pair', lambda pairs: pairs.pop(key, None))
+                adjust_post_count('likes.jsonl', post_id, -1)
+            else:
+                # Add like
+                new_like = {
+                    'id': get_next_id(likes),
+                    'user_id': current_user.id,
+                    'post_id': post_id,
+                    'created_at': datetime.utcnow().isoformat()
+                }
+                likes.append(new_like)
+                patch_index('likes.jsonl', 'by_pair', lambda pairs: pairs.__setitem__(key, new_like))
+                adjust_post_count('likes.jsonl', post_id, 1)
         
         # Redirect back to the post detail page
         return redirect(url_for('post_detail', post_id=post_id))
@@ -441,17 +1003,18 @@ def add_comment(post_id):
     content = request.form['content']
     
     try:
-        comments = load_json_file('Comments.json')
         new_comment = {
-            'id': get_next_id(comments),
             'user_id': current_user.id,
             'post_id': post_id,
             'content': content,
             'created_at': datetime.utcnow().isoformat()
         }
         
-        comments.append(new_comment)
-        save_json_file('Comments.json', comments)
+        with json_store('Comments.jsonl') as comments:
+            new_comment['id'] = get_next_id(comments)
+            comments.append(new_comment)
+            patch_index('Comments.jsonl', 'by_post', lambda groups: groups.setdefault(post_id, []).append(new_comment))
+            adjust_post_count('Comments.jsonl', post_id, 1)
         
         flash('Comment added successfully!', 'success')
         
@@ -461,6 +1024,27 @@ def add_comment(post_id):
     
     return redirect(url_for('post_detail', post_id=post_id))
 
+@cached_on_files(*DATA_FILES)
+def build_admin_dashboard():
+    """Everything the admin dashboard shows, built in one pass and reused until the data changes"""
+    # The enriched feed is cached, so reuse it for the posts table, count and lookup
+    posts = get_posts()
+    comments = read_json_file('Comments.jsonl')
+    likes = read_json_file('likes.jsonl')
+    # Prepare user and post lookups
+    user_lookup = get_users_by_id()
+    users = tuple(user_lookup.values())
+    post_lookup = {p.id: p for p in posts}
+    enriched_comments = admin_comment_rows(comments, user_lookup, post_lookup)
+    enriched_likes = admin_like_rows(likes, user_lookup, post_lookup)
+    stats = {
+        'total_posts': len(posts),
+        'total_users': len(users),
+        'total_comments': len(comments),
+        'total_likes': len(likes)
+    }
+    return users, posts, enriched_comments, enriched_likes, stats
+
 @app.route('/admin')
 @login_required
 def admin_dashboard():
@@ -468,39 +1052,8 @@ def admin_dashboard():
         flash('Access denied. Admin privileges required.', 'error')
         return redirect(url_for('index'))
     try:
-        users = load_json_file('Users.json')
-        posts = load_json_file('Posts.json')
-        comments = load_json_file('Comments.json')
-        likes = load_json_file('likes.json')
-        # Prepare user and post lookups
-        user_lookup = {u['id']: u for u in users}
-        post_lookup = {p['id']: p for p in posts}
-        # Enrich comments
-        enriched_comments = []
-        for c in comments:
-            enriched_comments.append({
-                'id': c['id'],
-                'user': user_lookup.get(c['user_id'], {'username': 'Unknown'}),
-                'post': post_lookup.get(c['post_id'], {'title': 'Unknown'}),
-                'content': c['content'],
-                'created_at': c['created_at']
-            })
-        # Enrich likes
-        enriched_likes = []
-        for l in likes:
-            enriched_likes.append({
-                'id': l['id'],
-                'user': user_lookup.get(l['user_id'], {'username': 'Unknown'}),
-                'post': post_lookup.get(l['post_id'], {'title': 'Unknown'}),
-                'created_at': l['created_at']
-            })
-        stats = {
-            'total_posts': len(posts),
-            'total_users': len(users),
-            'total_comments': len(comments),
-            'total_likes': len(likes)
-        }
-        return render_template('admin_dashboard.html', users=users, posts=get_posts(), stats=stats, comments=enriched_comments, likes=enriched_likes)
+        users, posts, comments, likes, stats = build_admin_dashboard()
+        return render_template('admin_dashboard.html', users=users, posts=posts, stats=stats, comments=comments, likes=likes)
     except Exception as e:
         logger.error(f"Admin dashboard error: {e}")
         flash('Error loading admin dashboard', 'error')
@@ -514,20 +1067,29 @@ def admin_delete_post(post_id):
         return redirect(url_for('index'))
 
     try:
-        # Delete likes related to this post
-        likes = load_json_file('likes.json')
-        likes = [l for l in likes if l['post_id'] != post_id]
-        save_json_file('likes.json', likes)
+        if post_id not in get_posts_by_id():
+            flash('Post not found', 'error')
+            return redirect(url_for('admin_dashboard'))
         
-        # Delete comments related to this post
-        comments = load_json_file('Comments.json')
-        comments = [c for c in comments if c['post_id'] != post_id]
-        save_json_file('Comments.json', comments)
+        like_counts, comment_counts = get_post_counts()
         
-        # Delete the post
-        posts = load_json_file('Posts.json')
-        posts = [p for p in posts if p['id'] != post_id]
-        save_json_file('Posts.json', posts)
+        # Open all the stores together, so nothing is written unless every filter succeeds;
+        # on exit comments and likes are saved before the post, and a failed save raises,
+        # which skips the saves still pending
+        with ExitStack() as stores:
+            # Delete the post
+            posts = stores.enter_context(json_store('Posts.json'))
+            posts[:] = [p for p in posts if p['id'] != post_id]
+            
+            # Delete likes related to this post, skipping the rewrite when there are none
+            if like_counts[post_id]:
+                likes = stores.enter_context(json_store('likes.jsonl'))
+                likes[:] = [l for l in likes if l['post_id'] != post_id]
+            
+            # Delete comments related to this post
+            if comment_counts[post_id]:
+                comments = stores.enter_context(json_store('Comments.jsonl'))
+                comments[:] = [c for c in comments if c['post_id'] != post_id]
         
         flash('Post deleted successfully!', 'success')
 
@@ -541,31 +1103,9 @@ def admin_delete_post(post_id):
 @login_required
 def profile():
     try:
-        posts = load_json_file('Posts.json')
-        likes = load_json_file('likes.json')
-        comments = load_json_file('Comments.json')
+        # Posts by current user, newest first, shared with the cached feed
+        user_posts = build_posts_by_user().get(current_user.id, ())
         
-        # Filter posts by current user
-        user_posts = []
-        for post in posts:
-            if post['user_id'] == current_user.id:
-                like_count = len([l for l in likes if l['post_id'] == post['id']])
-                comment_count = len([c for c in comments if c['post_id'] == post['id']])
-                
-                user_posts.append({
-                    'id': post['id'],
-                    'title': post['title'],
-                    'content': post['content'],
-                    'images': post.get('images'),
-                    'videos': post.get('videos'),
-                    'created_at': post['created_at'],
-                    'like_count': like_count,
-                    'comment_count': comment_count
-                })
-        
-        # Sort by created_at (newest first)
-        user_posts.sort(key=lambda x: x['created_at'], reverse=True)
-
         return render_template('profile.html', posts=user_posts)
         
     except Exception as e:
@@ -573,9 +1113,28 @@ def profile():
         flash('Error loading profile', 'error')
         return redirect(url_for('index'))
 
+# In production nginx serves /uploads/ straight from disk (see nginx.conf); this route is the fallback,
+# or just points nginx at the file when UPLOAD_ACCEL_PREFIX is set
 @app.route('/uploads/<filename>')
 def uploaded_file(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    if config.UPLOAD_ACCEL_PREFIX:
+        # Hand the transfer to nginx, which sends the file with sendfile(2)
+        path = safe_join(app.config['UPLOAD_FOLDER'], filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        response = app.response_class()
+        response.headers['X-Accel-Redirect'] = config.UPLOAD_ACCEL_PREFIX + quote(filename)
+        # Let nginx set the type from the file extension
+        del response.headers['Content-Type']
+        response.cache_control.max_age = config.UPLOAD_CACHE_MAX_AGE
+    else:
+        response = send_from_directory(app.config['UPLOAD_FOLDER'], filename,
+                                       conditional=True, max_age=config.UPLOAD_CACHE_MAX_AGE)
+    # Content-hashed names never change contents; older uploads kept the client's name
+    if CONTENT_HASH_NAME.match(filename):
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+    return response
 
 @app.route('/admin/comments')
 @login_required
@@ -583,21 +1142,10 @@ def admin_comments():
     if not current_user.is_admin:
         flash('Access denied. Admin privileges required.', 'error')
         return redirect(url_for('index'))
-    comments = load_json_file('Comments.json')
-    users = load_json_file('Users.json')
-    posts = load_json_file('Posts.json')
-    user_lookup = {u['id']: u for u in users}
-    post_lookup = {p['id']: p for p in posts}
-    # Enrich comments
-    enriched_comments = []
-    for c in comments:
-        enriched_comments.append({
-            'id': c['id'],
-            'user': user_lookup.get(c['user_id'], {'username': 'Unknown'}),
-            'post': post_lookup.get(c['post_id'], {'title': 'Unknown'}),
-            'content': c['content'],
-            'created_at': c['created_at']
-        })
+    comments = read_json_file('Comments.jsonl')
+    user_lookup = get_users_by_id()
+    post_lookup = get_posts_by_id()
+    enriched_comments = admin_comment_rows(comments, user_lookup, post_lookup)
     return render_template('admin_comments.html', comments=enriched_comments)
 
 @app.route('/admin/delete_comment/<int:comment_id>', methods=['POST'])
@@ -606,9 +1154,8 @@ def admin_delete_comment(comment_id):
     if not current_user.is_admin:
         flash('Access denied. Admin privileges required.', 'error')
         return redirect(url_for('index'))
-    comments = load_json_file('Comments.json')
-    comments = [c for c in comments if c['id'] != comment_id]
-    save_json_file('Comments.json', comments)
+    with json_store('Comments.jsonl') as comments:
+        comments[:] = [c for c in comments if c['id'] != comment_id]
     flash('Comment deleted successfully!', 'success')
     return redirect(url_for('admin_comments'))
 
@@ -618,19 +1165,10 @@ def admin_likes():
     if not current_user.is_admin:
         flash('Access denied. Admin privileges required.', 'error')
         return redirect(url_for('index'))
-    likes = load_json_file('likes.json')
-    users = load_json_file('Users.json')
-    posts = load_json_file('Posts.json')
-    user_lookup = {u['id']: u for u in users}
-    post_lookup = {p['id']: p for p in posts}
-    enriched_likes = []
-    for l in likes:
-        enriched_likes.append({
-            'id': l['id'],
-            'user': user_lookup.get(l['user_id'], {'username': 'Unknown'}),
-            'post': post_lookup.get(l['post_id'], {'title': 'Unknown'}),
-            'created_at': l['created_at']
-        })
+    likes = read_json_file('likes.jsonl')
+    user_lookup = get_users_by_id()
+    post_lookup = get_posts_by_id()
+    enriched_likes = admin_like_rows(likes, user_lookup, post_lookup)
     return render_template('admin_likes.html', likes=enriched_likes)
 
 @app.route('/admin/delete_like/<int:like_id>', methods=['POST'])
@@ -639,48 +1177,102 @@ def admin_delete_like(like_id):
     if not current_user.is_admin:
         flash('Access denied. Admin privileges required.', 'error')
         return redirect(url_for('index'))
-    likes = load_json_file('likes.json')
-    likes = [l for l in likes if l['id'] != like_id]
-    save_json_file('likes.json', likes)
+    with json_store('likes.jsonl') as likes:
+        likes[:] = [l for l in likes if l['id'] != like_id]
     flash('Like removed successfully!', 'success')
     return redirect(url_for('admin_likes'))
 
 def initialize_data():
     """Initialize data files and create admin user"""
     try:
+        migrate_json_lines()
+        
         # Initialize empty files if they don't exist
-        for filename in ['Users.json', 'Posts.json', 'Comments.json', 'likes.json']:
-            file_path = os.path.join(config.DATA_FOLDER, filename)
+        for filename in DATA_FILES:
+            file_path = data_path(filename)
             if not os.path.exists(file_path):
                 save_json_file(filename, [])
         
         # Check if admin user exists
-        users = load_json_file('Users.json')
-        if not any(u['username'] == 'admin' for u in users):
-            password_hash = generate_password_hash('admin123')
+        if 'admin' not in get_users_by_username():
+            password_hash = hash_password('admin123')
             admin_user = {
-                'id': get_next_id(users),
                 'username': 'admin',
                 'email': 'admin@example.com',
                 'password_hash': password_hash,
                 'is_admin': True,
                 'created_at': datetime.utcnow().isoformat()
             }
-            users.append(admin_user)
-            save_json_file('Users.json', users)
+            with json_store('Users.json') as users:
+                admin_user['id'] = get_next_id(users)
+                users.append(admin_user)
             logger.info('Admin user created: username=admin, password=admin123')
         
+        migrate_media_fields()
+        
         logger.info('Data files initialized successfully')
         
     except Exception as e:
         logger.error(f"Data initialization error: {e}")
         raise
 
+def migrate_json_lines():
+    """Convert comments and likes saved by older versions as a JSON list to JSON Lines"""
+    for filename in DATA_FILES:
+        legacy = filename[:-1]
+        if not is_json_lines(filename) or not os.path.exists(data_path(legacy)):
+            continue
+        with file_lock(filename):
+            if os.path.exists(data_path(filename)):
+                continue
+            if not save_json_file(filename, read_json_file(legacy, strict=True)):
+                raise OSError(f"Could not save {filename}")
+        os.remove(data_path(legacy))
+        logger.info(f'Converted {legacy} to {filename}')
+
+MEDIA_FIELDS = ('images', 'videos', 'documents')
+
+def migrate_media_fields():
+    """Store media filenames of older posts as JSON lists instead of JSON text"""
+    posts = read_json_file('Posts.json')
+    if not any(isinstance(post.get(field), str) for post in posts for field in MEDIA_FIELDS):
+        return
+    with json_store('Posts.json') as posts:
+        for i, post in enumerate(posts):
+            legacy = [field for field in MEDIA_FIELDS if isinstance(post.get(field), str)]
+            if legacy:
+                # Replace the record rather than editing the shared cached one
+                posts[i] = dict(post, **{field: media_list(post[field]) or None for field in legacy})
+    logger.info('Converted media fields of older posts to lists')
+
+def warm_caches():
+    """Parse the data files and build the lookups and feed ahead of the first request"""
+    for filename in DATA_FILES:
+        read_json_file(filename)
+    get_users_by_id()
+    get_users_by_username()
+    get_like_pairs()
+    get_comments_by_post()
+    get_posts()
+
 if __name__ == '__main__':
+    # Data files are stored compact; `python mainlocal.py --pretty [file ...]` prints them indented
+    if sys.argv[1:2] == ['--pretty']:
+        for filename in sys.argv[2:] or DATA_FILES:
+            print(json_dumps(read_json_file(filename), pretty=True).decode('utf-8'))
+        sys.exit(0)
+    
     try:
+        if config.ARGON2_TARGET_MS:
+            calibrate_password_hasher(config.ARGON2_TARGET_MS)
         initialize_data()
         logger.info('Starting BlogSphere application...')
-        app.run(host='0.0.0.0', port=5000, debug=True)
+        # Development server only; production runs under gunicorn (see gunicorn.conf.py).
+        # The debugger and reloader wrap every request, so they are only on with DEV=1
+        debug = os.environ.get('DEV') == '1'
+        if not debug:
+            logger.warning('Running the development server; use gunicorn -c gunicorn.conf.py mainlocal:app in production')
+        app.run(host='0.0.0.0', port=5000, debug=debug, threaded=True)
         
     except Exception as e:
         logger.error(f'Failed to start application: {e}')